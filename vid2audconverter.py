@@ -1,14 +1,30 @@
+import argparse
+import asyncio
 import subprocess
 import os
 import shutil
 import sys
 import tempfile
+from urllib.parse import parse_qs, urlparse
+
+# Resolve external programs once instead of searching PATH on every call
+YT_DLP = shutil.which("yt-dlp")
+FFMPEG = shutil.which("ffmpeg")
+
+# Number of DASH/HLS fragments yt-dlp fetches in parallel for one video
+CONCURRENT_FRAGMENTS = 4
+
+# Number of videos downloaded at the same time in batch mode
+DEFAULT_JOBS = 4
+
+# yt-dlp download archive kept next to the MP3s; videos listed here are skipped
+ARCHIVE_FILENAME = ".yt-archive.txt"
 
 def check_dependencies():
     """Check if required programs are available in PATH."""
     missing_programs = []
-    for program in ["yt-dlp", "ffmpeg"]:
-        if not shutil.which(program):
+    for program, path in [("yt-dlp", YT_DLP), ("ffmpeg", FFMPEG)]:
+        if not path:
             missing_programs.append(program)
     
     if missing_programs:
@@ -17,167 +33,235 @@ def check_dependencies():
             "Please ensure they are installed and added to your system's PATH."
         )
 
-def get_video_title(youtube_url):
-    """Extract the video title from the YouTube URL using yt-dlp."""
-    try:
-        yt_dlp_path = shutil.which("yt-dlp")
-        result = subprocess.run(
-            [yt_dlp_path, "--get-title", youtube_url],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        title = result.stdout.strip()
-        # Remove invalid characters for filenames
-        valid_chars = "-_.() abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
-        title = "".join(c for c in title if c in valid_chars)
-        return title
-    except subprocess.CalledProcessError as e:
-        print(f"Error fetching video title: {e.stderr}")
-        return "video"  # Fallback to a default name
+def move_downloads(temp_paths, output_dir):
+    """Move finished files out of a temp directory into output_dir.
+
+    Returns the saved paths and the temp paths that could not be moved.
+    """
+    output_files = []
+    unmoved_paths = []
+    for temp_file_path in temp_paths:
+        output_audio = os.path.join(output_dir, os.path.basename(temp_file_path))
+        try:
+            os.replace(temp_file_path, output_audio)
+            output_files.append(output_audio)
+        except OSError as e:
+            print(f"Error moving {temp_file_path}: {str(e)}")
+            unmoved_paths.append(temp_file_path)
+    return output_files, unmoved_paths
+
+async def read_printed_paths(stream, printed_paths):
+    """Collect the file paths yt-dlp prints, one per line, as they arrive."""
+    async for line in stream:
+        line = line.decode(errors="replace").strip()
+        if line:
+            printed_paths.append(line)
 
-def download_video(youtube_url, output_video):
-    """Download video using yt-dlp."""
+async def download_audio(youtube_url, output_dir):
+    """Download the audio track as MP3 using yt-dlp and return the paths of the saved files.
+
+    A playlist URL yields one file per entry. Returns an empty list if everything
+    is already recorded in the download archive.
+    """
     try:
-        print(f"Downloading video to: {output_video}")
-        yt_dlp_path = shutil.which("yt-dlp")
-
-        # Generate a temp path without creating the file
-        temp_dir = tempfile.gettempdir()
-        temp_file_path = os.path.join(temp_dir, f"temp_video_{os.getpid()}.%(ext)s")
-
-        result = subprocess.run(
-            [
-                yt_dlp_path,
-                "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                "--remux-video", "mp4",
-                "-o", temp_file_path,
+        print(f"Downloading audio: {youtube_url}")
+
+        # Download into a private temp directory so concurrent runs never see
+        # each other's files. It lives inside output_dir so the final move is a
+        # single same-filesystem rename.
+        temp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=output_dir)
+        printed_paths = []
+        try:
+            # Let yt-dlp name the file after the video title, capped at 200
+            # bytes so long titles don't exceed filesystem name limits. The id
+            # keeps different videos with the same title apart.
+            temp_template = os.path.join(temp_dir, "%(title).200B [%(id)s].%(ext)s")
+
+            command = [
+                YT_DLP,
+                "-f", "bestaudio/best",  # Skip the video stream entirely
+                "-N", str(CONCURRENT_FRAGMENTS),
+                "-x",
+                "--audio-format", "mp3",
+                "--audio-quality", "2",
+                # Better metadata support in older players
+                "--postprocessor-args", "ExtractAudio:-id3v2_version 3",
+                "--ffmpeg-location", FFMPEG,
+                "--restrict-filenames",
+                "--no-playlist",  # watch?v=ID&list=... means just that video
+                "--download-archive", os.path.join(output_dir, ARCHIVE_FILENAME),
+                "-o", temp_template,
+                "--print", "after_move:filepath",
                 youtube_url
-            ],
-            check=True,
-            capture_output=True,
-            text=True
-        )
+            ]
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                # Read paths as they are printed so entries that finished
+                # before a failure or Ctrl-C are still known
+                _, stderr = await asyncio.gather(
+                    read_printed_paths(process.stdout, printed_paths),
+                    process.stderr.read()
+                )
+                await process.wait()
+            except asyncio.CancelledError:
+                # Stop yt-dlp before its finished files are moved out
+                process.kill()
+                await process.wait()
+                raise
+            stderr = stderr.decode(errors="replace")
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    process.returncode, command,
+                    output="\n".join(printed_paths), stderr=stderr
+                )
+
+            if not printed_paths:
+                # Nothing was downloaded: the video is already in the archive
+                print(f"Video already downloaded, skipping: {youtube_url}")
+        finally:
+            # yt-dlp archives each entry as soon as it finishes, so every file
+            # it printed must be kept, even if the run failed or was cancelled
+            output_files, unmoved_paths = move_downloads(printed_paths, output_dir)
+            for output_audio in output_files:
+                print(f"Conversion complete for {youtube_url}! MP3 saved as: {output_audio}")
+            if unmoved_paths:
+                print(f"Downloaded files for {youtube_url} kept in: {temp_dir}")
+            else:
+                shutil.rmtree(temp_dir, ignore_errors=True)
 
-        # Find the actual downloaded file
-        downloaded_files = [f for f in os.listdir(temp_dir) if f.startswith(f"temp_video_{os.getpid()}")]
-        if not downloaded_files:
-            raise FileNotFoundError("Downloaded file not found in temp directory")
-        
-        temp_file_path = os.path.join(temp_dir, downloaded_files[0])
-        shutil.move(temp_file_path, output_video)
-
-        if os.path.exists(output_video):
-            print("Video downloaded successfully.")
-        else:
-            print("Error: Video file not created after download.")
-            print("yt-dlp output:", result.stdout)
-            print("yt-dlp error output:", result.stderr)
-            raise FileNotFoundError("Downloaded video file not found")
+        if unmoved_paths:
+            raise OSError(f"Could not move {len(unmoved_paths)} file(s) out of {temp_dir}")
+
+        return output_files
 
     except subprocess.CalledProcessError as e:
-        print(f"Error downloading video: {e.stderr}")
+        print(f"Error downloading audio from {youtube_url}: {e.stderr}")
         print("yt-dlp output:", e.stdout)
         raise
     except Exception as e:
-        print(f"An unexpected error occurred: {str(e)}")
+        print(f"An unexpected error occurred for {youtube_url}: {str(e)}")
         raise
 
-def is_video_valid(video_file):
-    """Check if the video file is valid using FFmpeg."""
-    try:
-        result = subprocess.run(
-            ["ffmpeg", "-v", "error", "-i", video_file, "-f", "null", "-"],
-            capture_output=True,
-            text=True
-        )
-        return result.returncode == 0
-    except Exception as e:
-        print(f"Error validating video: {str(e)}")
-        return False
+async def download_all(urls, output_dir, jobs):
+    """Download several URLs with at most `jobs` yt-dlp processes running at once.
 
-def convert_to_mp3(input_video, output_audio):
-    """Convert video to MP3 using FFmpeg."""
-    try:
-        if not os.path.exists(input_video):
-            raise FileNotFoundError(f"Input video file not found: {input_video}")
-        
-        print(f"Converting video to MP3...")
-        print(f"Input file: {input_video}")
-        print(f"Output file: {output_audio}")
-        
-        ffmpeg_path = shutil.which("ffmpeg")
-        result = subprocess.run(
-            [
-                ffmpeg_path,
-                "-y",  # Overwrite output file if exists
-                "-i", input_video,
-                "-vn",  # Disable video
-                "-acodec", "libmp3lame",
-                "-q:a", "2",
-                "-id3v2_version", "3",  # Better metadata support
-                output_audio
-            ],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        
-        if os.path.exists(output_audio):
-            print(f"Conversion complete! MP3 saved as: {output_audio}")
-        else:
-            print("Error: MP3 file not created after conversion")
-            print("FFmpeg output:", result.stdout)
-            raise FileNotFoundError("Output MP3 file not found")
-            
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting to MP3: {e.stderr}")
-        raise
+    Returns the list of URLs that failed.
+    """
+    semaphore = asyncio.Semaphore(jobs)
+
+    async def download_one(youtube_url):
+        async with semaphore:
+            return await download_audio(youtube_url, output_dir)
+
+    results = await asyncio.gather(
+        *(download_one(youtube_url) for youtube_url in urls),
+        return_exceptions=True
+    )
+    # download_audio has already reported each error
+    return [
+        youtube_url for youtube_url, result in zip(urls, results)
+        if isinstance(result, Exception)
+    ]
+
+def read_urls(lines):
+    """Return the URLs in an iterable of lines, skipping blank lines and # comments."""
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+def video_id(youtube_url):
+    """Return the YouTube video id in a URL, or None if it doesn't name a single video."""
+    parsed = urlparse(youtube_url)
+    host = parsed.netloc.lower()
+    path_parts = [part for part in parsed.path.split("/") if part]
+    if host.endswith("youtu.be"):
+        return path_parts[0] if path_parts else None
+    if host.endswith("youtube.com"):
+        query = parse_qs(parsed.query)
+        if query.get("v"):
+            return query["v"][0]
+        # /shorts/ID, /embed/ID, /live/ID and /v/ID
+        if len(path_parts) >= 2 and path_parts[0] in ("shorts", "embed", "live", "v"):
+            return path_parts[1]
+    return None
+
+def dedupe_urls(urls):
+    """Drop URLs that point at a video already in the list, keeping the first one.
+
+    URLs without a video id (e.g. playlists) are compared as plain strings.
+    """
+    seen = set()
+    unique_urls = []
+    for youtube_url in urls:
+        key = video_id(youtube_url) or youtube_url
+        if key not in seen:
+            seen.add(key)
+            unique_urls.append(youtube_url)
+    return unique_urls
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download YouTube videos as MP3 audio.")
+    parser.add_argument("urls", nargs="*", help="YouTube URLs to convert")
+    parser.add_argument("-f", "--file", help="text file with one YouTube URL per line")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=DEFAULT_JOBS,
+        help=f"number of videos to download at once (default: {DEFAULT_JOBS})"
+    )
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
 
 def main():
+    args = parse_args()
     print("Welcome to YouTube to MP3 Converter!")
     
     try:
         # First check if required programs are available
         check_dependencies()
-        
-        youtube_url = input("Enter the YouTube URL: ").strip()
-        if not youtube_url:
+
+        urls = list(args.urls)
+        if args.file:
+            with open(args.file, encoding="utf-8") as f:
+                urls.extend(read_urls(f))
+        elif not urls:
+            # Only prompt when run interactively; otherwise read URLs piped on stdin
+            if sys.stdin.isatty():
+                urls = read_urls([input("Enter the YouTube URL: ")])
+            else:
+                urls = read_urls(sys.stdin)
+
+        if not urls:
             print("Invalid URL. Please try again.")
             return
 
-        # Get the video title
-        video_title = get_video_title(youtube_url)
-        print(f"Video title: {video_title}")
+        # Concurrent downloads of the same video would overwrite each other
+        unique_urls = dedupe_urls(urls)
+        if len(unique_urls) < len(urls):
+            print(f"Skipping {len(urls) - len(unique_urls)} duplicate URL(s).")
+        urls = unique_urls
 
         # Get the script's directory
         script_dir = os.path.abspath(os.path.dirname(__file__))
-        
-        # Create absolute paths for output files using the video title
-        output_video = os.path.join(script_dir, f"{video_title}.mp4")
-        output_audio = os.path.join(script_dir, f"{video_title}.mp3")
-        
-        # Print working directory and file paths
+
+        # Print working directory and output location
         print(f"\nCurrent working directory: {os.getcwd()}")
-        print(f"Video will be saved to: {output_video}")
-        print(f"Audio will be saved to: {output_audio}\n")
-
-        # Step 1: Download the video
-        download_video(youtube_url, output_video)
-        
-        # Step 2: Validate the downloaded video
-        print("Validating downloaded video...")
-        if not is_video_valid(output_video):
-            os.remove(output_video)
-            raise ValueError("Downloaded video file is corrupted or invalid")
-        
-        # Step 3: Convert to MP3
-        convert_to_mp3(output_video, output_audio)
-        
-        # Optional: Remove the video file to save space
-        if os.path.exists(output_video):
-            os.remove(output_video)
-            print(f"Temporary video file {output_video} deleted.")
+        print(f"Audio will be saved to: {script_dir}\n")
+
+        # Download only the audio stream and extract it to MP3
+        failed_urls = asyncio.run(download_all(urls, script_dir, args.jobs))
+
+        if failed_urls:
+            print(f"\nFailed to convert {len(failed_urls)} of {len(urls)} URL(s):")
+            for youtube_url in failed_urls:
+                print(f"  {youtube_url}")
             
     except FileNotFoundError as e:
         print(f"File Error: {e}")